@@ -0,0 +1,519 @@
+import gzip
+import io
+import os
+import queue
+import time
+import subprocess
+import sys
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock, Thread
+
+try:
+    from flask import Flask, request, jsonify, Response
+except ImportError:
+    print("Flask not found. Attempting to install...")
+    try:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "Flask"])
+        print("Flask installed successfully. Please restart the application.")
+        sys.exit(0)
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to install Flask: {e}")
+        sys.exit(1)
+
+try:
+    import orjson
+except ImportError:
+    # Without orjson, jsonify falls back to Flask's stdlib-json provider.
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    # brotli compresses ~15-20% smaller than gzip; without it, clients that
+    # accept br simply get the gzip variant.
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    # Pillow is only needed for the perceptual-hash result cache and as the
+    # fallback JPEG decoder; without it every frame simply goes through the
+    # full pipeline undecoded.
+    Image = None
+
+try:
+    # libjpeg-turbo uses SIMD (SSE2/AVX2/NEON) for the IDCT and chroma
+    # upsampling, decoding several times faster than Pillow's default path.
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # Without numba the decorated helpers run as plain Python/numpy; the
+    # JIT'd versions are LLVM-autovectorized (AVX2/NEON) and release the GIL.
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return wrap
+
+# Initialize the Flask application
+app = Flask(__name__)
+
+# A 640px-wide JPEG at quality 0.7 is a few tens of KB; anything near this
+# limit is not a legitimate frame. werkzeug rejects oversized bodies with
+# 413 before the handler runs, so a hostile 100 MB upload never reaches
+# memory or the decoder.
+app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024
+
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class _OrjsonProvider(JSONProvider):
+        """
+        JSON provider backed by orjson (Rust, SIMD-accelerated), several
+        times faster than the stdlib module for both directions. Plugged
+        into the app so jsonify and request.get_json use it everywhere.
+        """
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = _OrjsonProvider(app)
+
+# Module-level PRNG for the simulated results. numpy's PCG64 generator is
+# several times faster per draw than random's Mersenne Twister, and one
+# vectorized call replaces the per-score Python-level random.uniform calls.
+_rng = np.random.default_rng()
+
+# --- Background analysis workers ---
+# The analysis takes seconds, so running it inside the HTTP request would pin
+# a server worker for the whole duration. Instead, /analyze enqueues the job
+# on a worker pool and immediately returns a job id; the client polls
+# /result/<job_id> until the analysis is done. (A Celery/RQ queue with a
+# Redis broker would be the same shape with cross-machine workers; for a
+# single-process deployment the stdlib pool gives the same decoupling
+# without the extra infrastructure.)
+_executor = ThreadPoolExecutor(max_workers=4)
+# job_id -> (future, creation time). Completed entries are normally removed
+# when the client collects the result; the TTL sweep catches clients that
+# POST a frame and then navigate away, so their futures and retained result
+# dicts don't accumulate forever.
+_jobs = {}
+_jobs_lock = Lock()
+_JOB_TTL_S = 300
+
+
+def _prune_expired_jobs():
+    """
+    Drop completed jobs whose result was never collected.
+    Callers must hold _jobs_lock.
+    """
+    cutoff = time.monotonic() - _JOB_TTL_S
+    expired = [job_id for job_id, (future, created) in _jobs.items()
+               if future.done() and created < cutoff]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+# --- Micro-batching ---
+# Neural nets run far more efficiently on a batch of N frames than on N
+# separate forward passes. In-flight frames are therefore coalesced: each
+# job drops its input on a queue, and a single batcher thread gathers up to
+# _MAX_BATCH items (waiting at most _BATCH_WAIT_S for stragglers) and runs
+# the model once for the whole batch.
+_MAX_BATCH = 8
+_BATCH_WAIT_S = 0.01
+_batch_queue = queue.Queue()
+
+
+def _decode_jpeg(image_data_bytes):
+    """
+    Decode a JPEG into an RGB uint8 ndarray (H, W, 3), preferring the
+    SIMD-accelerated libjpeg-turbo path. Returns None if the bytes can't
+    be decoded; the simulated model tolerates that, a real one would
+    reject the frame.
+    """
+    if _turbojpeg is not None:
+        try:
+            return _turbojpeg.decode(image_data_bytes, pixel_format=TJPF_RGB)
+        except Exception:
+            return None
+    if Image is not None:
+        try:
+            img = Image.open(io.BytesIO(image_data_bytes)).convert('RGB')
+            return np.asarray(img)
+        except Exception:
+            return None
+    return None
+
+
+# --- Numeric post-processing helpers ---
+# The hot per-frame arithmetic is factored into small functions that take
+# only ndarrays and scalars so numba can compile them when it's installed.
+
+@njit(cache=True, fastmath=True)
+def _twin_similarity(emb_a, emb_b):
+    """
+    Cosine similarity between two face embeddings.
+    """
+    dot = 0.0
+    norm_a = 0.0
+    norm_b = 0.0
+    for i in range(emb_a.shape[0]):
+        dot += emb_a[i] * emb_b[i]
+        norm_a += emb_a[i] * emb_a[i]
+        norm_b += emb_b[i] * emb_b[i]
+    if norm_a == 0.0 or norm_b == 0.0:
+        return 0.0
+    return dot / np.sqrt(norm_a * norm_b)
+
+
+# Warm the JIT cache at import with a representative shape so the first
+# user request doesn't pay the compilation cost.
+_twin_similarity(np.zeros(64, dtype=np.float32), np.zeros(64, dtype=np.float32))
+
+
+def _embed(frame):
+    """
+    Produce a crude 64-dim embedding for a face crop: grayscale intensities
+    sampled on an 8x8 grid. A real pipeline would use a face-embedding net;
+    the shape and dtype contract is the same.
+    """
+    gray = frame.astype(np.float32).mean(axis=2)
+    rows = np.linspace(0, gray.shape[0] - 1, 8).astype(np.int64)
+    cols = np.linspace(0, gray.shape[1] - 1, 8).astype(np.int64)
+    return gray[np.ix_(rows, cols)].ravel()
+
+
+def _model_forward(batch):
+    """
+    Run one (for now simulated) model forward pass over a batch of
+    (frame, mode) inputs, where frame is a decoded RGB ndarray (or None
+    for undecodable uploads). Returns one result per input.
+    """
+    # --- Placeholder for the actual AI model integration ---
+    # Here, you would stack the decoded frames into one tensor and call the
+    # model once for the whole batch. The simulation already does its real
+    # work (decode, embed, similarity); an artificial sleep here would only
+    # pin the batcher thread, and under any async-style server it would
+    # block a whole OS thread per batch for no reason.
+    return [_simulate_result(frame, mode) for frame, mode in batch]
+
+
+def _batch_worker():
+    """
+    Dedicated thread: drain the batch queue and resolve each job's Future.
+    """
+    while True:
+        items = [_batch_queue.get()]
+        deadline = time.monotonic() + _BATCH_WAIT_S
+        while len(items) < _MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            outputs = _model_forward([inputs for inputs, _future in items])
+        except Exception as e:
+            for _inputs, future in items:
+                future.set_exception(e)
+            continue
+
+        for (_inputs, future), output in zip(items, outputs):
+            future.set_result(output)
+
+
+_batch_thread = Thread(target=_batch_worker, daemon=True)
+_batch_thread.start()
+
+
+# --- Perceptual-hash result cache ---
+# Webcam frames are highly temporally redundant: consecutive clicks usually
+# show a near-identical scene. A 64-bit dHash of the frame (horizontal
+# gradient signs over a 9x8 grayscale downsample) is stable under JPEG noise
+# for identical scenes, so it makes a good cache key. A hit skips the whole
+# multi-second pipeline.
+_CACHE_MAX = 1024
+_result_cache = OrderedDict()
+_result_cache_lock = Lock()
+
+
+def _dhash(image_data_bytes):
+    """
+    Compute a 64-bit difference hash of a JPEG, or None if it can't be
+    decoded (the frame then just bypasses the cache).
+    """
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(image_data_bytes)).convert('L').resize(
+            (9, 8), Image.Resampling.BILINEAR)
+    except Exception:
+        return None
+    pixels = list(img.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _analyze_image(image_data_bytes, mode):
+    """
+    Run the (for now simulated) analysis pipeline on one frame.
+    Executed on a worker thread, never on the request thread.
+    """
+    print(f"Received request for analysis mode: {mode}")
+
+    cache_key = None
+    phash = _dhash(image_data_bytes)
+    if phash is not None:
+        cache_key = (phash, mode)
+        with _result_cache_lock:
+            if cache_key in _result_cache:
+                _result_cache.move_to_end(cache_key)
+                return _result_cache[cache_key]
+
+    # Decode here on the worker thread (the pool parallelizes decoding
+    # across jobs), then hand the frame to the batcher and wait for its
+    # slice of the batched forward pass.
+    frame = _decode_jpeg(image_data_bytes)
+    future = Future()
+    _batch_queue.put(((frame, mode), future))
+    result = future.result()
+
+    if cache_key is not None:
+        with _result_cache_lock:
+            _result_cache[cache_key] = result
+            if len(_result_cache) > _CACHE_MAX:
+                _result_cache.popitem(last=False)
+
+    return result
+
+
+# --- Result skeletons ---
+# The boxes, ids and messages in the simulated results are constant, but
+# they used to be rebuilt as fresh literals on every request, re-hashing
+# every dict key and reallocating every list. Hoist the static parts to
+# module scope and inject only the per-request scores.
+_TWIN_A_BOX = [100, 50, 150, 200]
+_TWIN_B_BOX = [400, 50, 150, 200]
+_STANDARD_BOX = [250, 100, 150, 200]
+
+_TWIN_IDS = {
+    True: ("Twin A", "Twin B"),
+    False: ("Person 1", "Person 2"),
+}
+_TWIN_MESSAGES = {
+    True: "Analysis complete: Two highly similar faces detected. They are a match.",
+    False: "Analysis complete: Two different faces detected. They are not a match.",
+}
+
+
+def _make_twin_result(scores, is_match):
+    """
+    Assemble a twin-mode result from the prebuilt skeleton parts and the
+    two face scores.
+    """
+    id_a, id_b = _TWIN_IDS[is_match]
+    return {
+        "message": _TWIN_MESSAGES[is_match],
+        "faces": [
+            {"id": id_a, "score": scores[0], "box": _TWIN_A_BOX},
+            {"id": id_b, "score": scores[1], "box": _TWIN_B_BOX}
+        ],
+        "is_twin_match": is_match
+    }
+
+
+def _simulate_result(frame, mode):
+    """
+    Build a simulated per-frame result for the given analysis mode.
+    You would replace this with your real computer vision pipeline.
+    """
+    if mode == 'twin':
+        # Compare embeddings of the left and right halves of the frame (a
+        # stand-in for the two detected face crops). Undecodable frames fall
+        # back to the old random outcome: twins with 70% chance.
+        if frame is not None and frame.shape[1] >= 2:
+            half = frame.shape[1] // 2
+            similarity = _twin_similarity(_embed(frame[:, :half]),
+                                          _embed(frame[:, half:]))
+            is_match = bool(similarity > 0.9)
+        else:
+            is_match = bool(_rng.random() < 0.7)
+
+        low, high = (0.95, 0.99) if is_match else (0.8, 0.9)
+        return _make_twin_result(_rng.uniform(low, high, size=2).tolist(), is_match)
+
+    # Standard mode
+    return {
+        "message": f"Analysis complete for mode: {mode}",
+        "faces": [
+            {"id": f"Person {int(_rng.integers(1, 101))}",
+             "score": float(_rng.uniform(0.7, 0.9)),
+             "box": _STANDARD_BOX}
+        ],
+        "is_twin_match": False
+    }
+
+# --- Backend Routes ---
+# The front-end lives in static/index.html. Serving it through the static
+# machinery gives us ETag/Last-Modified handling (conditional 304s) and
+# wsgi.file_wrapper for free. In production, front the app with the reverse
+# proxy in deploy/nginx.conf: it serves the page directly from disk and
+# proxies only the API routes here over HTTP/2 with keep-alive.
+
+# Compress the index page once at startup. Maximum compression levels are
+# fine here: the cost is paid at import, so the per-request cost is zero.
+with open(os.path.join(app.static_folder, 'index.html'), 'rb') as _f:
+    _index_html = _f.read()
+_index_html_gz = gzip.compress(_index_html, 9)
+_index_html_br = brotli.compress(_index_html, quality=11) if brotli else None
+
+
+def _compressed_index_response(body, encoding):
+    response = Response(body, mimetype='text/html')
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(body))
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+_INDEX_RESPONSE_GZ = _compressed_index_response(_index_html_gz, 'gzip')
+_INDEX_RESPONSE_BR = (_compressed_index_response(_index_html_br, 'br')
+                      if _index_html_br is not None else None)
+
+
+@app.route('/')
+def index():
+    """
+    Main route to serve the HTML front-end.
+    Serves a precompressed brotli/gzip variant when the client accepts
+    one, and falls back to the static file (with conditional GET) for the
+    rest.
+    """
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if _INDEX_RESPONSE_BR is not None and 'br' in accept_encoding:
+        return _INDEX_RESPONSE_BR
+    if 'gzip' in accept_encoding:
+        return _INDEX_RESPONSE_GZ
+    return app.send_static_file('index.html')
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    API endpoint to receive image data and enqueue the analysis.
+    Returns 202 with a job id; the client polls /result/<job_id>.
+    """
+    # Reject obviously bad uploads before reading the body: a wrong media
+    # type or a payload too small to be a JPEG never touches the decoder
+    # or the worker pool. (Oversized bodies are already refused by
+    # werkzeug via MAX_CONTENT_LENGTH before this handler runs.)
+    # mimetype is the lowercased media type without parameters, so a
+    # header like "image/jpeg; charset=binary" still passes.
+    if request.mimetype != 'image/jpeg':
+        return jsonify({"error": "Expected Content-Type: image/jpeg"}), 415
+    if request.content_length is not None and request.content_length < 100:
+        return jsonify({"error": "Image payload too small"}), 400
+
+    # The client POSTs the raw JPEG bytes with the analysis mode in
+    # the query string, so there is no base64/JSON layer to unwrap.
+    # cache=False tells werkzeug not to keep a second copy around.
+    mode = request.args.get('mode', 'standard')
+    image_data_bytes = request.get_data(cache=False)
+
+    if not image_data_bytes:
+        return jsonify({"error": "No image data received"}), 400
+
+    job_id = uuid.uuid4().hex
+    future = _executor.submit(_analyze_image, image_data_bytes, mode)
+    with _jobs_lock:
+        _prune_expired_jobs()
+        _jobs[job_id] = future, time.monotonic()
+
+    return jsonify({"job_id": job_id}), 202
+
+@app.route('/result/<job_id>')
+def result(job_id):
+    """
+    Poll endpoint for a queued analysis job.
+    202 while the job is still running, 200 with the result when done.
+    """
+    with _jobs_lock:
+        entry = _jobs.get(job_id)
+
+    if entry is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    future = entry[0]
+
+    if not future.done():
+        return jsonify({"status": "pending"}), 202
+
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
+
+    try:
+        return jsonify(future.result())
+    except Exception as e:
+        app.logger.error(f"An error occurred during image analysis: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@app.route('/events/<job_id>')
+def events(job_id):
+    """
+    Server-Sent Events stream for a queued analysis job. Emits a queued
+    status immediately and the result event the moment the job finishes,
+    instead of the client re-polling /result on a timer.
+    """
+    with _jobs_lock:
+        entry = _jobs.get(job_id)
+
+    if entry is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    future = entry[0]
+
+    def generate():
+        yield 'data: {"status": "queued"}\n\n'
+        try:
+            payload = app.json.dumps(future.result())
+        except Exception as e:
+            app.logger.error(f"An error occurred during image analysis: {e}")
+            payload = '{"error": "Internal server error"}'
+        with _jobs_lock:
+            _jobs.pop(job_id, None)
+        yield f"data: {payload}\n\n"
+
+    # X-Accel-Buffering tells nginx not to buffer the stream, so events
+    # reach the browser as soon as they are yielded.
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache',
+                             'X-Accel-Buffering': 'no'})
+
+if __name__ == '__main__':
+    # Development fallback only. The Werkzeug dev server is single-threaded
+    # and the debugger/reloader middleware adds overhead to every request.
+    # In production run behind gunicorn (see Procfile), e.g.:
+    #   gunicorn -w 1 -k gthread --threads 16 -b 0.0.0.0:5000 app:app
+    # Job state (_jobs, the result cache, the batcher queue) lives in this
+    # process, so scale with threads, not workers: a second worker process
+    # would answer /result and /events lookups for job ids it has never
+    # seen. Multiple workers need the job store moved to a shared backend
+    # (the Celery/Redis shape) first.
+    # The app will be available at http://127.0.0.1:5000
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1')